@@ -5,6 +5,8 @@ from dotenv import load_dotenv
 import logging
 import sys
 import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
 
 # -----------------------------------------------------------------------------
 # 1. PAGE CONFIGURATION & STYLING
@@ -217,6 +219,29 @@ def stream_azure_response_generic(messages, deployment_name, max_tokens=4000, to
         st.error(f"Generation failed: {str(e)}")
         raise e
 
+# Worker threads share token trackers, so updates are serialized
+token_tracker_lock = threading.Lock()
+
+def complete_azure_response_generic(messages, deployment_name, max_tokens=4000, token_tracker=None):
+    """Non-streaming call for background workers (no Streamlit calls, safe off the main thread)"""
+    try:
+        response = client.chat.completions.create(
+            model=deployment_name,
+            messages=messages,
+            temperature=0.8,
+            max_tokens=max_tokens
+        )
+    except Exception as e:
+        logger.error(f"❌ LLM Error: {str(e)}")
+        raise e
+
+    if token_tracker is not None and response.usage:
+        with token_tracker_lock:
+            token_tracker['prompt'] += response.usage.prompt_tokens
+            token_tracker['completion'] += response.usage.completion_tokens
+            token_tracker['total'] += response.usage.total_tokens
+    return response.choices[0].message.content or ""
+
 def display_execution_time(start_time, token_tracker=None):
     end_time = time.time()
     execution_time = end_time - start_time
@@ -254,6 +279,7 @@ def display_execution_time(start_time, token_tracker=None):
 
 import difflib
 import re
+from script_export import EXPORT_FORMATS, count_pages, export_bundle, export_bytes
 
 # -----------------------------------------------------------------------------
 # 2.5 EDIT & CHAT FUNCTIONALITY
@@ -303,6 +329,189 @@ def handle_ai_interaction(prompt, current_script, deployment_name):
     
     return stream_azure_response_generic(messages, deployment_name)
 
+# Edit planner: mechanical edits run locally, global semantic edits fan out per scene
+EDIT_MAX_WORKERS = int(os.getenv("SCRIPTX_EDIT_WORKERS", "8"))
+
+SCENE_SPLIT_RE = re.compile(r'^(?=[ \t*#_]*(?:INT\./EXT\.|EXT\./INT\.|I/E\.?|INT\.|EXT\.)\s)', re.MULTILINE | re.IGNORECASE)
+REGEX_EDIT_RE = re.compile(r'^\s*(?:s/(?P<sed_pat>(?:[^/\\]|\\.)+)/(?P<sed_rep>(?:[^/\\]|\\.)*)/(?P<sed_flags>[gi]*)|(?:replace|substitute)\s+(?:the\s+)?(?:regex|pattern)\s+/(?P<pat>(?:[^/\\]|\\.)+)/\s+(?:with|by|to)\s+(?P<rep>.+?))\s*$', re.IGNORECASE)
+LITERAL_EDIT_RE = re.compile(r'^\s*(?:please\s+)?(?P<verb>change|replace|swap|switch|rename)\s+(?:all\s+(?:instances\s+of\s+|occurrences\s+of\s+)?)?(?:the\s+character\s+)?(?P<old>.+?)\s+(?:to|with|into|->|→)\s+(?P<new>.+?)(?P<scope>\s+(?:everywhere|globally|throughout(?:\s+the\s+script)?|in\s+(?:the\s+)?(?:whole|entire|full)\s+script|across\s+(?:the\s+)?(?:whole\s+)?script|in\s+(?:all|every)\s+scenes?))?\s*[.!]?\s*$', re.IGNORECASE)
+# Fan-out rewrites scenes, so questions like "summarize the whole script" must stay in chat
+EDIT_VERB_RE = re.compile(r'^\s*(?:please\s+)?(?:change|rewrite|re-write|make|replace|remove|delete|add|insert|update|rename|swap|switch|convert|turn|set|move|cut|trim|shorten|expand|tighten|punch\s+up|revise|edit|adjust|tweak|fix)\b', re.IGNORECASE)
+GLOBAL_SCOPE_RE = re.compile(r'\b(?:everywhere|globally|throughout|every\s+scene|all\s+(?:the\s+)?scenes|each\s+scene|(?:whole|entire|full)\s+script|all\s+(?:instances|occurrences|dialogue)|consistently)\b', re.IGNORECASE)
+# Only unambiguous values take the local path; "change the tone to upbeat" must reach the LLM
+MONTH_NAME = r'(?:jan|feb|mar|apr|may|jun|jul|aug|sep|sept|oct|nov|dec)[a-z]*\.?'
+NUMBER_OR_DATE_RE = re.compile(rf'^(?:\d[\d,.:/\-]*|{MONTH_NAME}\s+\d{{1,2}}(?:st|nd|rd|th)?(?:,?\s+\d{{4}})?|\d{{1,2}}(?:st|nd|rd|th)?\s+{MONTH_NAME}(?:,?\s+\d{{4}})?)$', re.IGNORECASE)
+PROPER_NAME_RE = re.compile(r"^[A-Z][\w'\-]*$")
+
+QUOTE_PAIRS = {'"': '"', "'": "'", "`": "`", "“": "”"}
+
+def _unquote(value):
+    value = value.strip()
+    if len(value) >= 2 and QUOTE_PAIRS.get(value[0]) == value[-1]:
+        return value[1:-1], True
+    return value, False
+
+def _literal_pattern(old):
+    return re.compile(rf'(?<!\w){re.escape(old)}(?!\w)', re.IGNORECASE)
+
+def plan_script_edit(prompt, current_script):
+    """Classifies a chat request as a local mechanical edit, a parallel per-scene edit, or a plain chat turn"""
+    if prompt.strip().endswith("?"):
+        return {'mode': 'chat'}
+
+    regex_match = REGEX_EDIT_RE.match(prompt)
+    if regex_match:
+        pattern = regex_match.group('sed_pat') or regex_match.group('pat')
+        replacement = regex_match.group('sed_rep') if regex_match.group('sed_pat') else regex_match.group('rep')
+        replacement = _unquote(replacement)[0]
+        flags = re.MULTILINE | (re.IGNORECASE if "i" in (regex_match.group('sed_flags') or "") else 0)
+        try:
+            compiled = re.compile(pattern, flags)
+            first = compiled.search(current_script)
+            # Expanding once surfaces bad group references before anything is applied
+            if first:
+                first.expand(replacement)
+        except (re.error, IndexError):
+            first = None
+        if first:
+            return {'mode': 'regex', 'pattern': compiled, 'replacement': replacement}
+
+    literal_match = LITERAL_EDIT_RE.match(prompt)
+    if literal_match:
+        old, old_quoted = _unquote(literal_match.group('old'))
+        new, new_quoted = _unquote(literal_match.group('new'))
+        looks_literal = (
+            (old_quoted and new_quoted)
+            or (NUMBER_OR_DATE_RE.match(old) and NUMBER_OR_DATE_RE.match(new))
+            or (PROPER_NAME_RE.match(old) and PROPER_NAME_RE.match(new))
+        )
+        if old and looks_literal and _literal_pattern(old).search(current_script):
+            return {'mode': 'literal', 'old': old, 'new': new}
+
+    if EDIT_VERB_RE.match(prompt) and GLOBAL_SCOPE_RE.search(prompt) and len(split_script_scenes(current_script)) > 1:
+        return {'mode': 'fanout'}
+    return {'mode': 'chat'}
+
+def apply_local_edit(current_script, plan):
+    """Applies a literal or regex edit without an LLM call; returns (new_script, replacements)"""
+    if plan['mode'] == 'regex':
+        return plan['pattern'].subn(plan['replacement'], current_script)
+
+    new = plan['new']
+    def match_case(m):
+        found = m.group(0)
+        if found.isupper() and not new.isupper():
+            return new.upper()
+        if found[:1].isupper() and new[:1].islower():
+            return new[:1].upper() + new[1:]
+        return new
+    return _literal_pattern(plan['old']).subn(match_case, current_script)
+
+def split_script_scenes(script):
+    """Splits a script at scene headings; joining the result returns the original text"""
+    return [part for part in SCENE_SPLIT_RE.split(script) if part]
+
+def _edit_scene_worker(scene, prompt, deployment_name, token_tracker):
+    messages = [
+        {"role": "system", "content": """You are ScriptX, a professional Screenplay Architect.
+        You are editing ONE scene of a longer screenplay. Other scenes are being edited in parallel with the same instruction.
+
+        RULES:
+        - Apply the user's change to this scene only, keeping everything else word for word.
+        - Keep the scene heading and screenplay formatting.
+        - If the change does not apply to this scene, return it unchanged.
+        - Wrap the COMPLETE scene inside <SCENE> and </SCENE> markers."""},
+        {"role": "user", "content": f"SCENE:\n\n{scene}\n\nUSER REQUEST: {prompt}"}
+    ]
+    try:
+        response = complete_azure_response_generic(messages, deployment_name, token_tracker=token_tracker)
+    except Exception:
+        return None
+    match = re.search(r'<SCENE>(.*?)</SCENE>', response, re.DOTALL | re.IGNORECASE)
+    return match.group(1).strip() if match else None
+
+def _scene_edit_is_consistent(original, edited):
+    """Rejects worker output that lost its scene heading or lost/gained too much text"""
+    if not edited:
+        return False
+    # Heading text may legitimately change (NIGHT instead of DAY, a renamed place)
+    if SCENE_SPLIT_RE.match(original.lstrip()) and not SCENE_SPLIT_RE.match(edited.lstrip()):
+        return False
+    if len(original) > 200 and not (0.5 <= len(edited) / len(original) <= 2.0):
+        return False
+    return True
+
+def run_parallel_scene_edit(prompt, current_script, deployment_name, token_tracker=None):
+    """Edits every scene concurrently and merges the results; returns (new_script, summary)"""
+    scenes = split_script_scenes(current_script)
+    targets = [i for i, scene in enumerate(scenes) if scene.strip()]
+
+    with ThreadPoolExecutor(max_workers=max(1, min(EDIT_MAX_WORKERS, len(targets)))) as pool:
+        results = list(pool.map(lambda i: _edit_scene_worker(scenes[i], prompt, deployment_name, token_tracker), targets))
+
+    merged = list(scenes)
+    changed, rejected = 0, 0
+    for i, edited in zip(targets, results):
+        if not _scene_edit_is_consistent(scenes[i], edited):
+            rejected += 1
+            continue
+        # Keep the original inter-scene whitespace so the join stays stable
+        trailing = scenes[i][len(scenes[i].rstrip()):]
+        leading = scenes[i][:len(scenes[i]) - len(scenes[i].lstrip())]
+        edited = leading + edited + trailing
+        if edited != scenes[i]:
+            merged[i] = edited
+            changed += 1
+
+    new_script = "".join(merged)
+    if len(split_script_scenes(new_script)) != len(scenes):
+        logger.warning("⚠️ Parallel edit changed the scene count; keeping the original script")
+        return current_script, "The edit would have merged or split scenes, so the script was left unchanged."
+
+    summary = f"Edited {changed} of {len(targets)} scenes in parallel."
+    if rejected:
+        summary += f" {rejected} scene(s) failed the consistency check and were kept as they were."
+    return new_script, summary
+
+def render_export_controls(script_key):
+    """Builds exports only when requested and caches the result until the script changes"""
+    export_key = f"{script_key}_export"
+    choices = {label: fmt for fmt, (label, *_) in EXPORT_FORMATS.items()}
+    choices["All formats (.tar.gz)"] = "bundle"
+
+    label = st.selectbox("Export format", list(choices), key=f"{export_key}_format", label_visibility="collapsed")
+    fmt = choices[label]
+    compress = fmt != "bundle" and st.checkbox("Gzip", key=f"{export_key}_gzip")
+
+    # str hashes are cached by Python, so this check is cheap on every rerun
+    request_id = (fmt, compress, hash(st.session_state[script_key]))
+    cached = st.session_state.get(export_key)
+
+    if cached is not None and cached['id'] != request_id:
+        # Drop a stale export right away rather than holding it until the next Prepare
+        st.session_state.pop(export_key, None)
+        cached = None
+
+    if cached is None:
+        if st.button("📦 Prepare Export", key=f"{export_key}_prepare", use_container_width=True):
+            start_time = time.time()
+            if fmt == "bundle":
+                data, suffix, mime = export_bundle(st.session_state[script_key], f"script_{script_key}"), ".tar.gz", "application/gzip"
+            else:
+                data, suffix, mime = export_bytes(st.session_state[script_key], fmt, compress=compress)
+            logger.info(f"📦 Exported {script_key} as {label} ({len(data)} bytes) in {time.time() - start_time:.2f}s")
+            st.session_state[export_key] = {'id': request_id, 'data': data, 'name': f"script_{script_key}{suffix}", 'mime': mime}
+            st.rerun()
+        return
+
+    st.download_button(
+        label="📥 Download Script",
+        data=cached['data'],
+        file_name=cached['name'],
+        mime=cached['mime'],
+        use_container_width=True
+    )
+
 def render_script_editor(script_key, chat_key):
     """Renders the split-screen editor UI with robust script detection and streaming chat"""
     deployment = os.getenv("AZURE_LLM_DEPLOYMENT", "gpt-4o-mini")
@@ -331,13 +540,7 @@ def render_script_editor(script_key, chat_key):
                     st.session_state[diff_view_key] = None
                     st.rerun()
         with c2:
-            st.download_button(
-                label="📥 Download Script",
-                data=st.session_state[script_key],
-                file_name=f"script_{script_key}.txt",
-                mime="text/plain",
-                use_container_width=True
-            )
+            render_export_controls(script_key)
 
     with col_right:
         st.markdown("### 🤖 ScriptX Assistant")
@@ -356,35 +559,54 @@ def render_script_editor(script_key, chat_key):
                 last_prompt = st.session_state[chat_key][-1]["content"]
                 chat_msg_placeholder = st.empty()
                 with st.spinner("ScriptX is refining..."):
-                    response_gen = handle_ai_interaction(last_prompt, st.session_state[script_key], deployment)
-                    
-                    full_response = ""
-                    for chunk in response_gen:
-                        full_response += chunk
-                        visible_chat = re.sub(r'<SCRIPT>.*', '\n\n*(Updating script...)*', full_response, flags=re.DOTALL | re.IGNORECASE)
-                        visible_chat = re.sub(r'```.*', '\n\n*(Processing code...)*', visible_chat, flags=re.DOTALL | re.IGNORECASE)
-                        chat_msg_placeholder.markdown(f'<div class="chat-message ai-message">{visible_chat}</div>', unsafe_allow_html=True)
-                    
                     new_script = None
-                    script_match = re.search(r'<SCRIPT>(.*?)</SCRIPT>', full_response, re.DOTALL | re.IGNORECASE)
-                    if script_match:
-                        new_script = script_match.group(1).strip()
-                        final_chat = full_response.replace(script_match.group(0), "").strip()
+                    plan = plan_script_edit(last_prompt, st.session_state[script_key])
+
+                    # Failures must still produce an assistant reply, or the user's
+                    # message stays last and every rerun retries the same edit
+                    if plan['mode'] in ('literal', 'regex'):
+                        try:
+                            new_script, replacements = apply_local_edit(st.session_state[script_key], plan)
+                            final_chat = f"⚡ Applied locally: {replacements} replacement(s)."
+                        except (re.error, IndexError) as e:
+                            logger.error(f"❌ Local edit failed: {str(e)}")
+                            final_chat = f"⚠️ Could not apply that edit: {str(e)}"
+                    elif plan['mode'] == 'fanout':
+                        chat_msg_placeholder.markdown('<div class="chat-message ai-message">*(Editing scenes in parallel...)*</div>', unsafe_allow_html=True)
+                        try:
+                            new_script, final_chat = run_parallel_scene_edit(last_prompt, st.session_state[script_key], deployment)
+                        except Exception as e:
+                            logger.error(f"❌ Parallel edit failed: {str(e)}")
+                            final_chat = f"⚠️ Parallel edit failed, script left unchanged: {str(e)}"
                     else:
-                        code_match = re.search(r'```(?:python|markdown|text)?\n(.*?)\n```', full_response, re.DOTALL | re.IGNORECASE)
-                        if code_match:
-                            new_script = code_match.group(1).strip()
-                            final_chat = full_response.replace(code_match.group(0), "").strip()
+                        response_gen = handle_ai_interaction(last_prompt, st.session_state[script_key], deployment)
+
+                        full_response = ""
+                        for chunk in response_gen:
+                            full_response += chunk
+                            visible_chat = re.sub(r'<SCRIPT>.*', '\n\n*(Updating script...)*', full_response, flags=re.DOTALL | re.IGNORECASE)
+                            visible_chat = re.sub(r'```.*', '\n\n*(Processing code...)*', visible_chat, flags=re.DOTALL | re.IGNORECASE)
+                            chat_msg_placeholder.markdown(f'<div class="chat-message ai-message">{visible_chat}</div>', unsafe_allow_html=True)
+
+                        script_match = re.search(r'<SCRIPT>(.*?)</SCRIPT>', full_response, re.DOTALL | re.IGNORECASE)
+                        if script_match:
+                            new_script = script_match.group(1).strip()
+                            final_chat = full_response.replace(script_match.group(0), "").strip()
                         else:
-                            if "TITLE:" in full_response and len(full_response) > 500:
-                                parts = re.split(r'TITLE:', full_response, maxsplit=1, flags=re.IGNORECASE)
-                                if len(parts) > 1:
-                                    final_chat = parts[0].strip()
-                                    new_script = "TITLE:" + parts[1].strip()
+                            code_match = re.search(r'```(?:python|markdown|text)?\n(.*?)\n```', full_response, re.DOTALL | re.IGNORECASE)
+                            if code_match:
+                                new_script = code_match.group(1).strip()
+                                final_chat = full_response.replace(code_match.group(0), "").strip()
                             else:
-                                final_chat = full_response.strip()
-                    
-                    if new_script:
+                                if "TITLE:" in full_response and len(full_response) > 500:
+                                    parts = re.split(r'TITLE:', full_response, maxsplit=1, flags=re.IGNORECASE)
+                                    if len(parts) > 1:
+                                        final_chat = parts[0].strip()
+                                        new_script = "TITLE:" + parts[1].strip()
+                                else:
+                                    final_chat = full_response.strip()
+
+                    if new_script and new_script != st.session_state[script_key]:
                         diff_raw = get_diff_html(st.session_state[script_key], new_script)
                         st.session_state[diff_view_key] = f'<div class="script-viewer">{diff_raw}</div>'
                         st.session_state[script_key] = new_script
@@ -397,6 +619,235 @@ def render_script_editor(script_key, chat_key):
                 st.session_state[chat_key].append({"role": "user", "content": prompt})
                 st.rerun()
 
+# -----------------------------------------------------------------------------
+# 2.6 CONTINUITY LEDGER (Method 3)
+# -----------------------------------------------------------------------------
+# Bounds keep the serialized ledger small so every chunk call pays the same
+# prompt cost no matter how far into the script we are.
+LEDGER_MAX_CHARACTERS = 12
+LEDGER_MAX_LOCATIONS = 8
+LEDGER_MAX_THREADS = 8
+LEDGER_MAX_TIMELINE = 6
+LEDGER_MAX_ENTRY_CHARS = 120
+# Per-section character budgets (about 1800 in total) so one busy section
+# can never crowd another out of the prompt block
+LEDGER_SECTION_BUDGETS = {'characters': 600, 'locations': 360, 'threads': 480, 'timeline': 360}
+
+LEDGER_MARKER = "<LEDGER>"
+
+SCENE_HEADING_RE = re.compile(r'^\s*(?:INT\./EXT\.|EXT\./INT\.|I/E\.?|INT\.|EXT\.)\s*(.+?)\s*$', re.IGNORECASE)
+CHARACTER_CUE_RE = re.compile(r"^\s*([A-Z][A-Z0-9 .'\-]{1,30}?)\s*(?:\((?:V\.O\.|O\.S\.|O\.C\.|CONT'D)\))?\s*$")
+CUE_STOPWORDS = {"FADE IN", "FADE OUT", "CUT TO", "THE END", "TITLE", "CONTINUED", "DISSOLVE TO", "SMASH CUT", "LATER", "MONTAGE", "END"}
+
+LEDGER_INSTRUCTIONS = f"""After the screenplay text, write a line containing only {LEDGER_MARKER} followed by continuity updates, one per line:
+CHARACTER: NAME | current state or goal
+LOCATION: PLACE | what matters about it now
+THREAD+: a plot thread opened or still open
+THREAD-: a plot thread resolved in this chunk
+TIMELINE: when this chunk happens and what changed
+Only list what changed in this chunk."""
+
+def new_continuity_ledger():
+    """Creates an empty continuity ledger shared across all acts"""
+    return {'characters': {}, 'locations': {}, 'threads': [], 'timeline': []}
+
+def _ledger_clip(text):
+    text = " ".join(text.split())
+    if len(text) > LEDGER_MAX_ENTRY_CHARS:
+        text = text[:LEDGER_MAX_ENTRY_CHARS - 3].rstrip() + "..."
+    return text
+
+def _ledger_touch(table, key, note, limit):
+    """Inserts or refreshes an entry, evicting the least recently touched one"""
+    key = _ledger_clip(key).upper()
+    if not key:
+        return
+    previous = table.pop(key, "")
+    table[key] = _ledger_clip(note) if note else previous
+    while len(table) > limit:
+        table.pop(next(iter(table)))
+
+def _thread_key(text):
+    """Normalized form used to match a resolved thread against open ones"""
+    return " ".join(re.sub(r'[^\w\s]', " ", _ledger_clip(text).lower()).split())
+
+def _cue_has_dialogue(lines, i):
+    """Cues count only when speech follows on the next line (as in script_export); keeps BOOM. or OK. out"""
+    following = lines[i + 1] if i + 1 < len(lines) else ""
+    if following.startswith("("):
+        return True
+    return bool(following) and not following.isupper() and not SCENE_HEADING_RE.match(following)
+
+def update_continuity_ledger(ledger, chunk_text, ledger_updates="", label=""):
+    """Folds one chunk into the ledger: explicit model updates first, then cheap local extraction"""
+    saw_timeline = False
+    for line in ledger_updates.splitlines():
+        tag, sep, value = line.partition(":")
+        if not sep:
+            continue
+        tag = tag.strip().upper()
+        name, _, note = value.partition("|")
+        if tag == "CHARACTER":
+            _ledger_touch(ledger['characters'], name, note, LEDGER_MAX_CHARACTERS)
+        elif tag == "LOCATION":
+            _ledger_touch(ledger['locations'], name, note, LEDGER_MAX_LOCATIONS)
+        elif tag == "THREAD+":
+            thread = _ledger_clip(value)
+            if thread and _thread_key(thread) not in map(_thread_key, ledger['threads']):
+                ledger['threads'].append(thread)
+        elif tag == "THREAD-":
+            resolved = _thread_key(value)
+            if resolved:
+                ledger['threads'] = [t for t in ledger['threads'] if _thread_key(t) != resolved]
+        elif tag == "TIMELINE":
+            entry = _ledger_clip(value)
+            if entry:
+                ledger['timeline'].append(f"{label}: {entry}" if label else entry)
+                saw_timeline = True
+
+    # Headings and cues are always present in screenplay text, so the ledger
+    # stays useful even when the model skips the update block.
+    last_heading = ""
+    lines = [line.strip().strip("*#_ ").strip() for line in chunk_text.splitlines()]
+    for i, line in enumerate(lines):
+        heading = SCENE_HEADING_RE.match(line)
+        if heading:
+            place = re.split(r'\s+-+\s+', heading.group(1))[0]
+            # Touching a known entry keeps its note and marks it recently seen
+            _ledger_touch(ledger['locations'], place, "", LEDGER_MAX_LOCATIONS)
+            last_heading = line
+            continue
+        cue = CHARACTER_CUE_RE.match(line)
+        if cue and line.isupper() and not line.endswith((":", ".", "!")) and _cue_has_dialogue(lines, i):
+            name = cue.group(1).strip()
+            if name not in CUE_STOPWORDS:
+                _ledger_touch(ledger['characters'], name, "", LEDGER_MAX_CHARACTERS)
+
+    if not saw_timeline and last_heading:
+        ledger['timeline'].append(_ledger_clip(f"{label}: ends at {last_heading}" if label else f"ends at {last_heading}"))
+
+    del ledger['threads'][:-LEDGER_MAX_THREADS]
+    del ledger['timeline'][:-LEDGER_MAX_TIMELINE]
+    return ledger
+
+def _fit_entries(entries, budget, sep="; "):
+    """Keeps the newest whole entries that fit the budget and notes how many were left out"""
+    kept, used = [], 0
+    for entry in reversed(entries):
+        cost = len(entry) + (len(sep) if kept else 0)
+        if used + cost > budget:
+            break
+        kept.append(entry)
+        used += cost
+    kept.reverse()
+    if len(kept) < len(entries):
+        kept.insert(0, f"+{len(entries) - len(kept)} earlier")
+    return sep.join(kept)
+
+def _fit_table(table, budget):
+    """Drops notes from the least recently touched entries first, then whole entries"""
+    items = list(table.items())
+    for bare in range(len(items) + 1):
+        entries = [k if i < bare or not v else f"{k} ({v})" for i, (k, v) in enumerate(items)]
+        if len("; ".join(entries)) <= budget:
+            return "; ".join(entries)
+    return _fit_entries(list(table), budget)
+
+def render_continuity_ledger(ledger):
+    """Serializes the ledger into a compact, size-bounded prompt block"""
+    budgets = LEDGER_SECTION_BUDGETS
+    return (
+        f"CHARACTERS: {_fit_table(ledger['characters'], budgets['characters']) or 'none yet'}\n"
+        f"LOCATIONS: {_fit_table(ledger['locations'], budgets['locations']) or 'none yet'}\n"
+        f"OPEN THREADS: {_fit_entries(ledger['threads'], budgets['threads']) or 'none yet'}\n"
+        f"TIMELINE: {_fit_entries(ledger['timeline'], budgets['timeline'], sep=' -> ') or 'story start'}"
+    )
+
+def split_ledger_stream(stream, sink):
+    """Yields screenplay text from a stream and diverts everything after LEDGER_MARKER into sink"""
+    pending = ""
+    in_ledger = False
+    strip_lead = True
+    for piece in stream:
+        if in_ledger:
+            # Drop the closing half of a bolded **<LEDGER>** marker
+            if strip_lead:
+                piece = piece.lstrip("*_")
+                if not piece:
+                    continue
+                strip_lead = False
+            sink.append(piece)
+            continue
+        pending += piece
+        idx = pending.find(LEDGER_MARKER)
+        if idx != -1:
+            text = re.sub(r'[\s*_#]+$', "", pending[:idx])
+            if text:
+                yield text
+            rest = pending[idx + len(LEDGER_MARKER):].lstrip("*_")
+            if rest:
+                sink.append(rest)
+                strip_lead = False
+            in_ledger = True
+            pending = ""
+            continue
+        # Hold back a possible partial marker (plus markdown around it) split across stream chunks
+        safe = len(pending) - (len(LEDGER_MARKER) + 3)
+        if safe > 0:
+            yield pending[:safe]
+            pending = pending[safe:]
+    if pending:
+        yield pending
+
+# -----------------------------------------------------------------------------
+# 2.7 PIPELINE PROMPTS (shared by the method pages and the comparison runner)
+# -----------------------------------------------------------------------------
+def method1_outline_messages(user_input, num_pages):
+    return [
+        {"role": "system", "content": "You are an expert screenwriter."},
+        {"role": "user", "content": f"Create a {num_pages}-page script outline for: {user_input}. Format as numbered list of scenes with summaries."}
+    ]
+
+def method1_scene_messages(scene, user_input):
+    return [
+        {"role": "system", "content": "Write a screenplay scene. Format: SCENE HEADING, ACTION, CHARACTER, DIALOGUE."},
+        {"role": "user", "content": f"Write this scene based on outline:\n{scene}\n\nContext: {user_input}"}
+    ]
+
+def method2_skeleton_messages(user_input, num_scenes):
+    return [
+        {"role": "system", "content": "Create concise scene summaries."},
+        {"role": "user", "content": f"Create {num_scenes} scene summaries for: {user_input}"}
+    ]
+
+def method2_expansion_messages(summary, context):
+    return [
+        {"role": "system", "content": "Write full screenplay scene."},
+        {"role": "user", "content": f"Expand this summary:\n{summary}\n\nContext:\n{context}"}
+    ]
+
+def method3_act_outline_messages(act_idx, act_len, user_input, ledger):
+    return [
+        {"role": "system", "content": "Create act outline."},
+        {"role": "user", "content": f"Outline Act {act_idx} ({act_len} pages) for: {user_input}\n\nStory so far:\n{render_continuity_ledger(ledger)}"}
+    ]
+
+def method3_chunk_messages(chunk_size, act_idx, chunk_idx, act_outline, ledger):
+    return [
+        {"role": "system", "content": f"Write screenplay chunk.\n\n{LEDGER_INSTRUCTIONS}"},
+        {"role": "user", "content": f"Write {chunk_size} pages for Act {act_idx}, Chunk {chunk_idx+1}.\nOutline: {act_outline}\nContinuity Ledger:\n{render_continuity_ledger(ledger)}"}
+    ]
+
+def parse_outline_scenes(outline_text):
+    """Pulls numbered/bulleted scene lines out of an outline or skeleton"""
+    scenes = [line.strip() for line in outline_text.split('\n') if line.strip() and (line[0].isdigit() or line.startswith('-'))]
+    return scenes or outline_text.split('\n\n')
+
+def method3_act_pages(num_pages, act_struct):
+    if "3-Act" in act_struct: return [int(num_pages*0.25), int(num_pages*0.5), int(num_pages*0.25)]
+    elif "4-Act" in act_struct: return [num_pages//4]*4
+    else: return [num_pages//5]*5
+
 # -----------------------------------------------------------------------------
 # 3. PAGE LOGIC: HOME
 # -----------------------------------------------------------------------------
@@ -448,7 +899,7 @@ def render_home():
     st.markdown("""
     | Feature | Method 1 (Sequential) | Method 2 (Iterative) | Method 3 (Chunk-Based) |
     | :--- | :--- | :--- | :--- |
-    | **Context** | Outline vs Current Scene | Last 3 Scenes (Rolling) | Previous Chunk Summary |
+    | **Context** | Outline vs Current Scene | Last 3 Scenes (Rolling) | Continuity Ledger (Bounded) |
     | **Continuity** | Structural (High) | Micro-Detail (Excellent) | Narrative Arc (Very Good) |
     | **Generation Speed** | ⚡ Fastest | 🐢 Slowest | ⚡ Fast-Medium |
     | **Cost / Tokens** | 💲 Low | 💲💲💲 High | 💲💲 Medium |
@@ -467,6 +918,7 @@ def render_method1():
         if st.button("🔄 Generate New Script", key="m1_reset"):
             st.session_state.m1_script = ""
             st.session_state.m1_chat_history = []
+            st.session_state.pop("m1_script_export", None)
             st.rerun()
         
         render_script_editor("m1_script", "m1_chat_history")
@@ -492,10 +944,7 @@ def render_method1():
         outline_ph = st.empty()
         
         def gen_outline():
-            return stream_azure_response_generic([
-                {"role": "system", "content": "You are an expert screenwriter."},
-                {"role": "user", "content": f"Create a {num_pages}-page script outline for: {user_input}. Format as numbered list of scenes with summaries."}
-            ], deployment, token_tracker=token_tracker)
+            return stream_azure_response_generic(method1_outline_messages(user_input, num_pages), deployment, token_tracker=token_tracker)
             
         outline_text = ""
         with outline_ph.container():
@@ -503,8 +952,7 @@ def render_method1():
         
         # 2. Scenes
         st.subheader("Phase 2: Scene Execution")
-        scenes = [line.strip() for line in outline_text.split('\n') if line.strip() and (line[0].isdigit() or line.startswith('-'))]
-        if not scenes: scenes = outline_text.split('\n\n')
+        scenes = parse_outline_scenes(outline_text)
         
         full_script = f"TITLE: {user_input[:50]}...\n\nOUTLINE:\n{outline_text}\n\nMODALITIES: SEQUENTIAL\n\n"
         progress = st.progress(0)
@@ -514,10 +962,7 @@ def render_method1():
             progress.progress((i+1) / len(scenes))
             
             def gen_scene():
-                return stream_azure_response_generic([
-                    {"role": "system", "content": "Write a screenplay scene. Format: SCENE HEADING, ACTION, CHARACTER, DIALOGUE."},
-                    {"role": "user", "content": f"Write this scene based on outline:\n{scene}\n\nContext: {user_input}"}
-                ], deployment, token_tracker=token_tracker)
+                return stream_azure_response_generic(method1_scene_messages(scene, user_input), deployment, token_tracker=token_tracker)
             
             scene_content = st.write_stream(gen_scene())
             full_script += f"\n\n{scene_content}\n\n"
@@ -541,6 +986,7 @@ def render_method2():
         if st.button("🔄 Generate New Script", key="m2_reset"):
             st.session_state.m2_script = ""
             st.session_state.m2_chat_history = []
+            st.session_state.pop("m2_script_export", None)
             st.rerun()
         
         render_script_editor("m2_script", "m2_chat_history")
@@ -571,18 +1017,14 @@ def render_method2():
         
         def gen_skeleton():
             num_scenes = num_pages // 2
-            return stream_azure_response_generic([
-                {"role": "system", "content": "Create concise scene summaries."},
-                {"role": "user", "content": f"Create {num_scenes} scene summaries for: {user_input}"}
-            ], deployment, token_tracker=token_tracker)
+            return stream_azure_response_generic(method2_skeleton_messages(user_input, num_scenes), deployment, token_tracker=token_tracker)
             
         skeleton_text = ""
         with skeleton_ph.container():
             skeleton_text = st.write_stream(gen_skeleton())
             
         # Parse
-        scene_summaries = [l.strip() for l in skeleton_text.split('\n') if l.strip() and (l[0].isdigit() or l.startswith('-'))]
-        if not scene_summaries: scene_summaries = skeleton_text.split('\n\n')
+        scene_summaries = parse_outline_scenes(skeleton_text)
 
         # Phase 2: Expansion
         st.subheader("Phase 2: Expanding Scenes")
@@ -598,10 +1040,7 @@ def render_method2():
             context = "\n".join(previous_scenes[-context_window:])
             
             def gen_expansion():
-                return stream_azure_response_generic([
-                    {"role": "system", "content": "Write full screenplay scene."},
-                    {"role": "user", "content": f"Expand this summary:\n{summary}\n\nContext:\n{context}"}
-                ], deployment, token_tracker=token_tracker)
+                return stream_azure_response_generic(method2_expansion_messages(summary, context), deployment, token_tracker=token_tracker)
             
             scene_text = st.write_stream(gen_expansion())
             previous_scenes.append(scene_text)
@@ -624,6 +1063,7 @@ def render_method3():
         if st.button("🔄 Generate New Script", key="m3_reset"):
             st.session_state.m3_script = ""
             st.session_state.m3_chat_history = []
+            st.session_state.pop("m3_script_export", None)
             st.rerun()
         
         render_script_editor("m3_script", "m3_chat_history")
@@ -649,39 +1089,36 @@ def render_method3():
         token_tracker = {'prompt': 0, 'completion': 0, 'total': 0}
 
         # Calc pages
-        if "3-Act" in act_struct: pages = [int(num_pages*0.25), int(num_pages*0.5), int(num_pages*0.25)]
-        elif "4-Act" in act_struct: pages = [num_pages//4]*4
-        else: pages = [num_pages//5]*5
+        pages = method3_act_pages(num_pages, act_struct)
         
         full_script = f"TITLE: {user_input[:50]}...\n\nSTRUCTURE: {act_struct}\n\nMODALITIES: CHUNK-BASED\n\n"
-        
+
+        # One ledger for the whole script so continuity carries across act boundaries
+        ledger = new_continuity_ledger()
+
         for act_idx, act_len in enumerate(pages, 1):
             st.header(f"Act {act_idx} ({act_len} pages)")
-            
+
             # Outline Act
             st.caption("Generating Act Outline...")
             def gen_act_out():
-                return stream_azure_response_generic([
-                    {"role": "system", "content": "Create act outline."},
-                    {"role": "user", "content": f"Outline Act {act_idx} ({act_len} pages) for: {user_input}"}
-                ], deployment, token_tracker=token_tracker)
+                return stream_azure_response_generic(method3_act_outline_messages(act_idx, act_len, user_input, ledger), deployment, token_tracker=token_tracker)
             act_outline = st.write_stream(gen_act_out())
-            
+
             # Chunks
             num_chunks = max(1, act_len // chunk_size)
-            last_summary = ""
-            
+
             for chunk_idx in range(num_chunks):
                 st.subheader(f"Act {act_idx} - Chunk {chunk_idx+1}")
+                ledger_updates = []
                 def gen_chunk():
-                    return stream_azure_response_generic([
-                        {"role": "system", "content": "Write screenplay chunk."},
-                        {"role": "user", "content": f"Write {chunk_size} pages for Act {act_idx}, Chunk {chunk_idx+1}.\nOutline: {act_outline}\nPrev Summary: {last_summary}"}
-                    ], deployment, token_tracker=token_tracker)
-                
+                    return split_ledger_stream(stream_azure_response_generic(
+                        method3_chunk_messages(chunk_size, act_idx, chunk_idx, act_outline, ledger),
+                        deployment, token_tracker=token_tracker), ledger_updates)
+
                 chunk_content = st.write_stream(gen_chunk())
                 full_script += f"\n\n{chunk_content}\n\n"
-                last_summary = chunk_content[-500:] # fast summary
+                update_continuity_ledger(ledger, chunk_content, "".join(ledger_updates), label=f"A{act_idx}C{chunk_idx+1}")
                 st.markdown("---")
                 
         st.session_state.m3_script = full_script
@@ -689,7 +1126,232 @@ def render_method3():
         st.rerun()
 
 # -----------------------------------------------------------------------------
-# 7. MAIN NAVIGATION ROUTER
+# 7. PAGE LOGIC: METHOD COMPARISON
+# -----------------------------------------------------------------------------
+# The three pipelines run headless on worker threads (no Streamlit calls there);
+# the main thread only polls their run records and renders progress.
+class ComparisonCancelled(Exception):
+    """Raised inside a pipeline once its comparison run has been abandoned"""
+
+def _new_compare_run(name, cancel):
+    return {'name': name, 'tokens': {'prompt': 0, 'completion': 0, 'total': 0}, 'calls': 0,
+            'first_scene': None, 'end': None, 'progress': "Waiting...", 'script': "", 'error': None,
+            'body_start': 0, 'cancel': cancel}
+
+def _compare_call(run, messages, deployment):
+    # Checked before every call so an abandoned run stops billing at the next step
+    if run['cancel'].is_set():
+        raise ComparisonCancelled("Comparison cancelled")
+    text = complete_azure_response_generic(messages, deployment, token_tracker=run['tokens'])
+    with token_tracker_lock:
+        run['calls'] += 1
+    return text
+
+def _compare_scene_done(run, done, total, unit="Scene"):
+    if run['first_scene'] is None:
+        run['first_scene'] = time.time()
+    run['progress'] = f"{unit} {done}/{total}"
+
+def _compare_method1(run, cfg, get_outline):
+    run['progress'] = "Outline..."
+    outline_text = get_outline()
+    scenes = parse_outline_scenes(outline_text)
+    scenes = scenes[:min(len(scenes), cfg['num_pages'] // 2)]
+    full_script = f"TITLE: {cfg['user_input'][:50]}...\n\nOUTLINE:\n{outline_text}\n\nMODALITIES: SEQUENTIAL\n\n"
+    run['body_start'] = len(full_script)
+    for i, scene in enumerate(scenes):
+        full_script += f"\n\n{_compare_call(run, method1_scene_messages(scene, cfg['user_input']), cfg['deployment'])}\n\n"
+        _compare_scene_done(run, i + 1, len(scenes))
+    return full_script
+
+def _compare_method2(run, cfg, get_skeleton):
+    run['progress'] = "Skeleton..."
+    skeleton_text = get_skeleton()
+    summaries = parse_outline_scenes(skeleton_text)[:cfg['num_pages'] // 2]
+    full_script = f"TITLE: {cfg['user_input'][:50]}...\n\nSKELETON:\n{skeleton_text}\n\nMODALITIES: ITERATIVE\n\n"
+    run['body_start'] = len(full_script)
+    previous_scenes = []
+    for i, summary in enumerate(summaries):
+        context = "\n".join(previous_scenes[-cfg['context_window']:])
+        scene_text = _compare_call(run, method2_expansion_messages(summary, context), cfg['deployment'])
+        previous_scenes.append(scene_text)
+        full_script += f"\n\n{scene_text}\n\n"
+        _compare_scene_done(run, i + 1, len(summaries))
+    return full_script
+
+def _compare_method3(run, cfg):
+    pages = method3_act_pages(cfg['num_pages'], cfg['act_struct'])
+    total_chunks = sum(max(1, act_len // cfg['chunk_size']) for act_len in pages)
+    full_script = f"TITLE: {cfg['user_input'][:50]}...\n\nSTRUCTURE: {cfg['act_struct']}\n\nMODALITIES: CHUNK-BASED\n\n"
+    run['body_start'] = len(full_script)
+    ledger = new_continuity_ledger()
+    done = 0
+    for act_idx, act_len in enumerate(pages, 1):
+        run['progress'] = f"Act {act_idx} outline..."
+        act_outline = _compare_call(run, method3_act_outline_messages(act_idx, act_len, cfg['user_input'], ledger), cfg['deployment'])
+        for chunk_idx in range(max(1, act_len // cfg['chunk_size'])):
+            ledger_updates = []
+            raw = _compare_call(run, method3_chunk_messages(cfg['chunk_size'], act_idx, chunk_idx, act_outline, ledger), cfg['deployment'])
+            chunk_content = "".join(split_ledger_stream(iter([raw]), ledger_updates))
+            full_script += f"\n\n{chunk_content}\n\n"
+            update_continuity_ledger(ledger, chunk_content, "".join(ledger_updates), label=f"A{act_idx}C{chunk_idx+1}")
+            done += 1
+            _compare_scene_done(run, done, total_chunks, unit="Chunk")
+    return full_script
+
+def _run_compare_job(run, job):
+    try:
+        run['script'] = job()
+        run['progress'] = "Done"
+    except Exception as e:
+        run['error'] = str(e)
+        run['progress'] = "Failed"
+    finally:
+        run['end'] = time.time()
+
+def run_method_comparison(cfg, share_outline, on_poll=None):
+    """Runs Methods 1-3 concurrently for one concept and returns the run records"""
+    cancel = threading.Event()
+    runs = {key: _new_compare_run(name, cancel) for key, name in
+            [('m1', "Method 1: Sequential"), ('m2', "Method 2: Iterative"), ('m3', "Method 3: Chunk-Based")]}
+    shared = _new_compare_run("Shared outline (M1 + M2)", cancel) if share_outline else None
+    started = time.time()
+
+    pool = ThreadPoolExecutor(max_workers=4)
+    try:
+        if shared:
+            # Method 1's numbered outline doubles as Method 2's scene skeleton
+            outline_future = pool.submit(_compare_call, shared, method1_outline_messages(cfg['user_input'], cfg['num_pages']), cfg['deployment'])
+            get_outline = get_skeleton = outline_future.result
+        else:
+            get_outline = lambda: _compare_call(runs['m1'], method1_outline_messages(cfg['user_input'], cfg['num_pages']), cfg['deployment'])
+            get_skeleton = lambda: _compare_call(runs['m2'], method2_skeleton_messages(cfg['user_input'], cfg['num_pages'] // 2), cfg['deployment'])
+
+        futures = [
+            pool.submit(_run_compare_job, runs['m1'], lambda: _compare_method1(runs['m1'], cfg, get_outline)),
+            pool.submit(_run_compare_job, runs['m2'], lambda: _compare_method2(runs['m2'], cfg, get_skeleton)),
+            pool.submit(_run_compare_job, runs['m3'], lambda: _compare_method3(runs['m3'], cfg)),
+        ]
+        while wait(futures, timeout=0.5).not_done:
+            if on_poll:
+                on_poll(runs, time.time() - started)
+    finally:
+        # Streamlit stops the script inside on_poll when the user navigates away or
+        # reruns; without this the pipelines would keep making calls for a dead run
+        cancel.set()
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    return {'started': started, 'ended': time.time(), 'runs': runs, 'shared': shared}
+
+def build_comparison_rows(result):
+    """Report rows; methods using the shared outline are charged its full cost (their standalone price)"""
+    started, shared = result['started'], result['shared']
+    shared_tokens = shared['tokens']['total'] if shared else 0
+    shared_calls = shared['calls'] if shared else 0
+
+    rows = []
+    for key, run in result['runs'].items():
+        uses_shared = shared is not None and key in ('m1', 'm2')
+        tokens = run['tokens']['total'] + (shared_tokens if uses_shared else 0)
+        # Only generated scene text counts, so the M1/M2 outline preamble cannot pad pages
+        scene_text = run['script'][run['body_start']:]
+        pages = count_pages(scene_text) if scene_text.strip() else 0
+        rows.append({
+            'Method': run['name'],
+            'Wall Time (s)': f"{run['end'] - started:.1f}",
+            'Time to First Scene (s)': f"{run['first_scene'] - started:.1f}" if run['first_scene'] else "—",
+            'Pages': pages,
+            'Tokens': tokens,
+            'Tokens / Page': f"{tokens / pages:.0f}" if pages else "—",
+            'Calls': run['calls'] + (shared_calls if uses_shared else 0),
+            'Status': f"❌ {run['error']}" if run['error'] else "✅",
+        })
+
+    total_tokens = shared_tokens + sum(run['tokens']['total'] for run in result['runs'].values())
+    total_calls = shared_calls + sum(run['calls'] for run in result['runs'].values())
+    rows.append({
+        'Method': "All (this run)" + (" — outline shared" if shared else ""),
+        'Wall Time (s)': f"{result['ended'] - started:.1f}",
+        'Time to First Scene (s)': "—",
+        'Pages': "—",
+        'Tokens': total_tokens,
+        'Tokens / Page': "—",
+        'Calls': total_calls,
+        'Status': f"Saved {shared_calls} call(s), {shared_tokens} tokens" if shared else "",
+    })
+    return rows
+
+def _markdown_table(rows):
+    header = list(rows[0])
+    lines = ["| " + " | ".join(header) + " |", "| " + " | ".join([":---"] * len(header)) + " |"]
+    lines += ["| " + " | ".join(str(row[col]) for col in header) + " |" for row in rows]
+    return "\n".join(lines)
+
+def render_comparison():
+    st.title("⚖️ Method Comparison")
+    st.markdown("**Overview**: Runs all three methods at the same time for one concept and reports speed and token cost side by side.")
+
+    report = st.session_state.compare_report
+    if report:
+        if st.button("🔄 New Comparison", key="cmp_reset"):
+            st.session_state.compare_report = None
+            st.rerun()
+
+        st.markdown(f"**Concept**: {report['concept']}")
+        st.markdown(_markdown_table(report['rows']))
+
+        for i, (key, script) in enumerate(report['scripts'].items(), 1):
+            with st.expander(f"📄 {report['rows'][i - 1]['Method']}"):
+                if script and st.button("✏️ Open in Editor", key=f"cmp_open_{key}"):
+                    st.session_state[f"{key}_script"] = script
+                    st.session_state[f"{key}_chat_history"] = []
+                    st.session_state.pop(f"{key}_script_export", None)
+                    st.session_state.page = f"method{i}"
+                    st.rerun()
+                st.markdown(f'<div class="script-viewer">{script or "No script generated."}</div>', unsafe_allow_html=True)
+        return
+
+    user_input = st.text_area("Script Description", placeholder="Enter your story concept...", height=100, key="cmp_input")
+    deployment = os.getenv("AZURE_LLM_DEPLOYMENT", "gpt-4o-mini")
+
+    c1, c2, c3, c4 = st.columns(4)
+    with c1:
+        num_pages = st.number_input("Target Pages", 30, 200, 140, key="cmp_pages")
+    with c2:
+        context_window = st.number_input("M2 Rolling Context (scenes)", 1, 5, 3, key="cmp_window")
+    with c3:
+        chunk_size = st.number_input("M3 Chunk Size", 5, 20, 10, key="cmp_chunk")
+    with c4:
+        act_struct = st.selectbox("M3 Structure", ["3-Act (25/50/25)", "4-Act (25/25/25/25)", "5-Act (20/20/20/20/20)"], key="cmp_struct")
+    share_outline = st.checkbox("Share one phase-1 outline between Methods 1 and 2", value=True, key="cmp_share")
+
+    if st.button("Run Comparison", key="cmp_btn"):
+        if not user_input:
+            st.error("Please enter a description.")
+            return
+
+        cfg = {'user_input': user_input, 'deployment': deployment, 'num_pages': num_pages,
+               'context_window': context_window, 'chunk_size': chunk_size, 'act_struct': act_struct}
+        status_ph = st.empty()
+
+        def on_poll(runs, elapsed):
+            status = "\n".join(f"- **{run['name']}**: {run['progress']} ({run['tokens']['total']} tokens)" for run in runs.values())
+            status_ph.markdown(f"⏱️ {elapsed:.0f}s elapsed\n\n{status}")
+
+        with st.spinner("Running all three methods..."):
+            result = run_method_comparison(cfg, share_outline, on_poll=on_poll)
+
+        rows = build_comparison_rows(result)
+        logger.info("⚖️ Comparison finished:\n" + _markdown_table(rows))
+        st.session_state.compare_report = {
+            'concept': user_input,
+            'rows': rows,
+            'scripts': {key: run['script'] for key, run in result['runs'].items()},
+        }
+        st.rerun()
+
+# -----------------------------------------------------------------------------
+# 8. MAIN NAVIGATION ROUTER
 # -----------------------------------------------------------------------------
 
 # Initialize Session State
@@ -705,6 +1367,9 @@ for i in range(1, 4):
     if chat_key not in st.session_state:
         st.session_state[chat_key] = []
 
+if 'compare_report' not in st.session_state:
+    st.session_state.compare_report = None
+
 # Helper to change page
 def set_page(p):
     st.session_state.page = p
@@ -715,7 +1380,7 @@ if st.session_state.page == 'home':
 else:
     # Render Navbar logic
     # We use columns for the navbar at the top
-    c1, c2, c3, c4 = st.columns([1, 2, 2, 2])
+    c1, c2, c3, c4, c5 = st.columns([1, 2, 2, 2, 2])
     with c1:
         if st.button("🏠 Home"): set_page('home'); st.rerun()
     with c2:
@@ -724,6 +1389,8 @@ else:
         if st.button("Method 2: Iterative expansion"): set_page('method2'); st.rerun()
     with c4:
         if st.button("Method 3: Chunk-Based"): set_page('method3'); st.rerun()
+    with c5:
+        if st.button("Compare Methods"): set_page('compare'); st.rerun()
     
     st.markdown("<hr style='margin: 0.5rem 0 2rem 0; border: 0; border-top: 1px solid rgba(255,255,255,0.1);'/>", unsafe_allow_html=True)
 
@@ -733,3 +1400,5 @@ else:
         render_method2()
     elif st.session_state.page == 'method3':
         render_method3()
+    elif st.session_state.page == 'compare':
+        render_comparison()
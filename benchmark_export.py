@@ -0,0 +1,64 @@
+"""Export benchmark: time and peak memory per format on a synthetic long script.
+
+Usage: python benchmark_export.py [--pages 200] [--repeat 3]
+"""
+import argparse
+import random
+import time
+import tracemalloc
+
+from script_export import EXPORT_FORMATS, count_pages, export_bundle, export_bytes
+
+CHARACTERS = ["MAYA", "JONAH", "DR. ELLIS", "RUIZ", "THE COURIER"]
+PLACES = ["INT. SAFEHOUSE - NIGHT", "EXT. HARBOR - DAY", "INT. LAB - CONTINUOUS", "EXT. ROOFTOP - DUSK"]
+WORDS = "the signal keeps folding back on itself and nobody in this room wants to admit what it means for tomorrow".split()
+
+def synthetic_script(pages, seed=7):
+    """Builds generated-style screenplay text that lays out to roughly `pages` pages"""
+    rng = random.Random(seed)
+    parts = ["TITLE: Benchmark Feature\n\n"]
+    while count_pages("".join(parts)) < pages:
+        for _ in range(20):
+            parts.append(f"**{rng.choice(PLACES)}**\n\n")
+            parts.append(" ".join(rng.choices(WORDS, k=rng.randint(20, 45))).capitalize() + ".\n\n")
+            for _ in range(rng.randint(3, 6)):
+                parts.append(f"{rng.choice(CHARACTERS)}\n")
+                if rng.random() < 0.2:
+                    parts.append("(quietly)\n")
+                parts.append(" ".join(rng.choices(WORDS, k=rng.randint(6, 24))).capitalize() + ".\n\n")
+            parts.append("CUT TO:\n\n")
+    return "".join(parts)
+
+def measure(fn, repeat):
+    """Best wall time over untraced runs, then peak allocation from one traced run"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    tracemalloc.start()
+    result = fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return min(timings), peak, len(result)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    script = synthetic_script(args.pages)
+    print(f"Script: {len(script) / 1024:.0f} KiB, {count_pages(script)} laid-out pages\n")
+    print(f"{'Export':<22}{'Best time (ms)':>16}{'Peak mem (KiB)':>16}{'Output (KiB)':>14}")
+
+    jobs = [(label, lambda fmt=fmt: export_bytes(script, fmt)[0]) for fmt, (label, *_) in EXPORT_FORMATS.items()]
+    jobs += [(label + " .gz", lambda fmt=fmt: export_bytes(script, fmt, compress=True)[0]) for fmt, (label, *_) in EXPORT_FORMATS.items()]
+    jobs.append(("Bundle (.tar.gz)", lambda: export_bundle(script, "benchmark")))
+
+    for label, job in jobs:
+        best, peak, size = measure(job, args.repeat)
+        print(f"{label:<22}{best * 1000:>16.1f}{peak / 1024:>16.0f}{size / 1024:>14.0f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,354 @@
+"""Streaming screenplay export (Fountain / Final Draft FDX / PDF).
+
+The generated script text is parsed lazily into (kind, text) elements and
+each writer consumes that stream straight into a binary file object, so an
+export never holds more than one paragraph (or one PDF page) of intermediate
+state on top of the output itself.
+"""
+import gzip
+import io
+import re
+import tarfile
+import tempfile
+from xml.sax.saxutils import escape as xml_escape
+
+# -----------------------------------------------------------------------------
+# 1. ELEMENT MODEL & PARSER
+# -----------------------------------------------------------------------------
+TITLE = "title"
+HEADING = "heading"
+ACTION = "action"
+CHARACTER = "character"
+PARENTHETICAL = "parenthetical"
+DIALOGUE = "dialogue"
+TRANSITION = "transition"
+
+HEADING_RE = re.compile(r'^(?:INT\./EXT\.|EXT\./INT\.|I/E\.?|INT\.|EXT\.)\s', re.IGNORECASE)
+TRANSITION_RE = re.compile(r'^(?:[A-Z ]+TO:|FADE (?:IN|OUT)[:.]?|FADE TO BLACK\.?|THE END\.?)$')
+CHARACTER_RE = re.compile(r"^[A-Z][A-Z0-9 .'\-]{0,30}(?:\s*\([A-Z.' ]+\))?$")
+# "JONAH: What now?" style dialogue, common in generated scripts
+INLINE_CUE_RE = re.compile(r"^([A-Z][A-Z0-9 .'\-]{0,30}?)\s*(\([A-Z.' ]+\))?\s*:\s*(?:(\([^)]*\))\s*)?(.+)$")
+# Element labels some prompts elicit ("SCENE HEADING: INT. LAB - NIGHT")
+ELEMENT_LABELS = {
+    "SCENE HEADING": HEADING,
+    "SLUGLINE": HEADING,
+    "ACTION": ACTION,
+    "CHARACTER": CHARACTER,
+    "PARENTHETICAL": PARENTHETICAL,
+    "DIALOGUE": DIALOGUE,
+    "TRANSITION": TRANSITION,
+}
+# Leading words of labels and transitions that share the "WORD: text" shape but are not speakers
+INLINE_CUE_STOPWORDS = {"TITLE", "OUTLINE", "SKELETON", "STRUCTURE", "MODALITIES", "NOTE", "NOTES", "SCENE", "ACT",
+                        "CHUNK", "PAGE", "DAY", "NIGHT", "LATER", "MORNING", "EVENING", "FADE", "CUT", "DISSOLVE",
+                        "SMASH", "MATCH", "SUPER", "INSERT", "CHYRON", "MONTAGE", "FLASHBACK", "SEQUENCE"}
+MARKUP_RE = re.compile(r'^[#>\s]+|\*\*|__')
+
+def _clean(line):
+    return MARKUP_RE.sub("", line).strip()
+
+def _labelled_line(line):
+    """Elements for a "LABEL: text" line, or None when it is not one"""
+    match = INLINE_CUE_RE.match(line)
+    if not match or HEADING_RE.match(line):
+        return None
+    label = match.group(1).strip()
+    body = line.split(":", 1)[1].strip()
+
+    # "SCENE 3: INT. LAB - NIGHT" and "SCENE HEADING: INT. ..." are headings whatever the label
+    if HEADING_RE.match(body):
+        return [(HEADING, body.upper())]
+    if label in ELEMENT_LABELS:
+        kind = ELEMENT_LABELS[label]
+        return [(kind, body.upper() if kind in (HEADING, CHARACTER) else body)]
+    if label.split()[0] in INLINE_CUE_STOPWORDS or label.endswith(" TO"):
+        return None
+
+    name, extension, parenthetical, speech = match.groups()
+    elements = [(CHARACTER, f"{name.strip()} {extension}" if extension else name.strip())]
+    if parenthetical:
+        elements.append((PARENTHETICAL, parenthetical))
+    elements.append((DIALOGUE, speech.strip()))
+    return elements
+
+def _inline_elements(lines):
+    """Splits a paragraph of "NAME: line" dialogue or labelled elements into screenplay elements"""
+    for line in lines:
+        elements = _labelled_line(line)
+        if elements:
+            yield from elements
+        elif HEADING_RE.match(line):
+            yield HEADING, line.upper()
+        else:
+            yield ACTION, line
+
+def parse_script(text):
+    """Yields (kind, text) elements from generated script text, one paragraph at a time"""
+    paragraph = []
+    first = True
+
+    def flush(lines, first):
+        head = lines[0]
+        if first and head.upper().startswith("TITLE:"):
+            yield TITLE, head.split(":", 1)[1].strip()
+            lines = lines[1:]
+            if not lines:
+                return
+            head = lines[0]
+
+        if any(_labelled_line(line) for line in lines):
+            yield from _inline_elements(lines)
+            return
+
+        if HEADING_RE.match(head):
+            yield HEADING, head.upper()
+            lines = lines[1:]
+        elif TRANSITION_RE.match(head) and len(lines) == 1:
+            yield TRANSITION, head
+            return
+        elif CHARACTER_RE.match(head) and len(lines) > 1:
+            yield CHARACTER, head
+            speech = []
+            for line in lines[1:]:
+                if line.startswith("(") and line.endswith(")"):
+                    if speech:
+                        yield DIALOGUE, " ".join(speech)
+                        speech = []
+                    yield PARENTHETICAL, line
+                else:
+                    speech.append(line)
+            if speech:
+                yield DIALOGUE, " ".join(speech)
+            return
+
+        if lines:
+            yield ACTION, " ".join(lines)
+
+    # StringIO iterates lazily, avoiding a full splitlines() copy
+    for raw in io.StringIO(text):
+        line = _clean(raw)
+        if line:
+            paragraph.append(line)
+            continue
+        if paragraph:
+            yield from flush(paragraph, first)
+            first = False
+            paragraph = []
+    if paragraph:
+        yield from flush(paragraph, first)
+
+# -----------------------------------------------------------------------------
+# 2. TEXT FORMATS
+# -----------------------------------------------------------------------------
+def _text_sink(fh):
+    return io.TextIOWrapper(fh, encoding="utf-8", newline="\n")
+
+def write_fountain(elements, fh):
+    """Stream-writes Fountain markup"""
+    out = _text_sink(fh)
+    for kind, text in elements:
+        if kind == TITLE:
+            out.write(f"Title: {text}\n\n")
+        elif kind == HEADING:
+            out.write(f"{text}\n\n" if HEADING_RE.match(text) else f".{text}\n\n")
+        elif kind == CHARACTER:
+            out.write(f"{text}\n")
+        elif kind == PARENTHETICAL:
+            out.write(f"{text}\n")
+        elif kind == DIALOGUE:
+            out.write(f"{text}\n\n")
+        elif kind == TRANSITION:
+            out.write(f"{text}\n\n" if text.endswith("TO:") else f"> {text}\n\n")
+        else:
+            # An all-caps action line would otherwise read as a character cue
+            out.write(f"!{text}\n\n" if text.isupper() else f"{text}\n\n")
+    out.flush()
+    out.detach()
+
+FDX_TYPES = {
+    HEADING: "Scene Heading",
+    ACTION: "Action",
+    CHARACTER: "Character",
+    PARENTHETICAL: "Parenthetical",
+    DIALOGUE: "Dialogue",
+    TRANSITION: "Transition",
+}
+
+def write_fdx(elements, fh):
+    """Stream-writes a Final Draft (.fdx) document"""
+    out = _text_sink(fh)
+    out.write('<?xml version="1.0" encoding="UTF-8" standalone="no" ?>\n')
+    out.write('<FinalDraft DocumentType="Script" Template="No" Version="5">\n<Content>\n')
+    title = None
+    for kind, text in elements:
+        if kind == TITLE:
+            title = text
+            continue
+        out.write(f'<Paragraph Type="{FDX_TYPES[kind]}"><Text>{xml_escape(text)}</Text></Paragraph>\n')
+    out.write('</Content>\n')
+    if title:
+        out.write('<TitlePage>\n<Content>\n')
+        out.write(f'<Paragraph Alignment="Center" Type="Action"><Text>{xml_escape(title)}</Text></Paragraph>\n')
+        out.write('</Content>\n</TitlePage>\n')
+    out.write('</FinalDraft>\n')
+    out.flush()
+    out.detach()
+
+# -----------------------------------------------------------------------------
+# 3. PAGINATION & PDF
+# -----------------------------------------------------------------------------
+# US Letter, 12pt Courier (7.2pt per character), standard screenplay margins
+PAGE_WIDTH = 612
+PAGE_HEIGHT = 792
+LINE_HEIGHT = 12
+LINES_PER_PAGE = 54
+TOP_Y = PAGE_HEIGHT - 72
+CHAR_WIDTH = 7.2
+
+# kind -> (x offset in points, wrap width in characters, blank lines before)
+PDF_LAYOUT = {
+    TITLE: (108, 60, 0),
+    HEADING: (108, 60, 1),
+    ACTION: (108, 60, 1),
+    CHARACTER: (266, 38, 1),
+    PARENTHETICAL: (223, 25, 0),
+    DIALOGUE: (180, 35, 0),
+    TRANSITION: (None, 20, 1),
+}
+
+def _wrap(text, width):
+    words = text.split()
+    line = ""
+    for word in words:
+        while len(word) > width:
+            if line:
+                yield line
+                line = ""
+            yield word[:width]
+            word = word[width:]
+        if not line:
+            line = word
+        elif len(line) + 1 + len(word) <= width:
+            line += " " + word
+        else:
+            yield line
+            line = word
+    if line:
+        yield line
+
+def paginate(elements):
+    """Yields pages as lists of (x, line) tuples following screenplay layout"""
+    page = []
+    for kind, text in elements:
+        x, width, gap = PDF_LAYOUT[kind]
+        if kind in (HEADING, CHARACTER, TRANSITION):
+            text = text.upper()
+        lines = list(_wrap(text, width))
+        # Keep a cue or heading with at least two lines of what follows
+        needed = len(lines) + (gap if page else 0) + (2 if kind in (HEADING, CHARACTER) else 0)
+        if page and len(page) + needed > LINES_PER_PAGE:
+            yield page
+            page = []
+        elif page:
+            page.extend([(0, "")] * gap)
+        for line in lines:
+            if len(page) >= LINES_PER_PAGE:
+                yield page
+                page = []
+            line_x = x if x is not None else PAGE_WIDTH - 72 - len(line) * CHAR_WIDTH
+            page.append((line_x, line))
+    if page:
+        yield page
+
+def count_pages(text):
+    """Page count of the script as it would be laid out in the PDF export"""
+    return sum(1 for _ in paginate(parse_script(text)))
+
+def _pdf_string(text):
+    data = text.encode("cp1252", errors="replace")
+    return data.replace(b"\\", b"\\\\").replace(b"(", b"\\(").replace(b")", b"\\)")
+
+def write_pdf(elements, fh):
+    """Stream-writes a paginated PDF, one page object at a time"""
+    offsets = {}
+    position = 0
+
+    def emit(data):
+        nonlocal position
+        fh.write(data)
+        position += len(data)
+
+    def emit_object(obj_id, body):
+        offsets[obj_id] = position
+        emit(b"%d 0 obj\n" % obj_id + body + b"\nendobj\n")
+
+    emit(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+    emit_object(1, b"<< /Type /Catalog /Pages 2 0 R >>")
+    emit_object(3, b"<< /Type /Font /Subtype /Type1 /BaseFont /Courier /Encoding /WinAnsiEncoding >>")
+
+    page_ids = []
+    next_id = 4
+    for number, page in enumerate(paginate(elements), 1):
+        ops = [b"BT /F1 12 Tf"]
+        if number > 1:
+            label = b"%d." % number
+            ops.append(b"1 0 0 1 %.1f %d Tm (%s) Tj" % (PAGE_WIDTH - 72 - len(label) * CHAR_WIDTH, PAGE_HEIGHT - 36, label))
+        for row, (x, line) in enumerate(page):
+            if line:
+                ops.append(b"1 0 0 1 %.1f %d Tm (%s) Tj" % (x, TOP_Y - row * LINE_HEIGHT, _pdf_string(line)))
+        ops.append(b"ET")
+        content = b"\n".join(ops)
+
+        content_id, page_id = next_id, next_id + 1
+        next_id += 2
+        emit_object(content_id, b"<< /Length %d >>\nstream\n" % len(content) + content + b"\nendstream")
+        emit_object(page_id, b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 %d %d] /Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % (PAGE_WIDTH, PAGE_HEIGHT, content_id))
+        page_ids.append(page_id)
+
+    kids = b" ".join(b"%d 0 R" % pid for pid in page_ids)
+    emit_object(2, b"<< /Type /Pages /Kids [%s] /Count %d >>" % (kids, len(page_ids)))
+
+    xref_at = position
+    emit(b"xref\n0 %d\n0000000000 65535 f \n" % next_id)
+    for obj_id in range(1, next_id):
+        emit(b"%010d 00000 n \n" % offsets[obj_id])
+    emit(b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (next_id, xref_at))
+
+# -----------------------------------------------------------------------------
+# 4. EXPORT ENTRY POINTS
+# -----------------------------------------------------------------------------
+# format -> (label, file extension, mime type, writer)
+EXPORT_FORMATS = {
+    "fountain": ("Fountain", ".fountain", "text/plain", write_fountain),
+    "fdx": ("Final Draft (FDX)", ".fdx", "application/xml", write_fdx),
+    "pdf": ("PDF", ".pdf", "application/pdf", write_pdf),
+}
+
+def export_script(text, fmt, fh):
+    """Parses text and streams the requested format into a binary file object"""
+    EXPORT_FORMATS[fmt][3](parse_script(text), fh)
+
+def export_bytes(text, fmt, compress=False):
+    """Returns (data, file_name_suffix, mime) for a single format, optionally gzipped"""
+    _, ext, mime, _ = EXPORT_FORMATS[fmt]
+    buffer = io.BytesIO()
+    if compress:
+        with gzip.GzipFile(fileobj=buffer, mode="wb") as gz:
+            export_script(text, fmt, gz)
+        return buffer.getvalue(), ext + ".gz", "application/gzip"
+    export_script(text, fmt, buffer)
+    return buffer.getvalue(), ext, mime
+
+def export_bundle(text, basename):
+    """Returns a .tar.gz holding every export format"""
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode="w:gz") as tar:
+        for fmt, (_, ext, _, _) in EXPORT_FORMATS.items():
+            # Spool to disk past 8MB so large scripts do not double up in memory
+            with tempfile.SpooledTemporaryFile(max_size=8 * 1024 * 1024) as spool:
+                export_script(text, fmt, spool)
+                info = tarfile.TarInfo(basename + ext)
+                info.size = spool.tell()
+                spool.seek(0)
+                tar.addfile(info, spool)
+    return buffer.getvalue()